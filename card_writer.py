@@ -0,0 +1,141 @@
+import os
+import queue
+import threading
+
+TEMP_PREFIX = '.'
+TEMP_SUFFIX = '.tmp'
+
+
+def temp_path_for(path):
+    # Hidden temp file next to the target so the rename stays on one filesystem
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f"{TEMP_PREFIX}{name}{TEMP_SUFFIX}")
+
+
+def fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, data):
+    """Write one file through a temp file and rename it into place"""
+    writer = AtomicCardWriter(batch_size=1)
+    writer.write(path, data)
+    writer.close()
+
+
+def remove_stale_temp_files(directory):
+    """Delete temp files left behind by a run that crashed before renaming"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(TEMP_PREFIX + 'soil_card_') and name.endswith(TEMP_SUFFIX):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+class AtomicCardWriter:
+    """Writes cards to temp files and renames them into place in batches.
+
+    Each temp file is fsynced as it is written, so a finished name only
+    ever appears after its data is on disk and a crash leaves hidden temp
+    files rather than truncated cards. The renames and the directory sync
+    are done once per batch instead of once per card.
+
+    A path written twice before a flush is renamed once, with the last
+    data written winning.
+    """
+
+    def __init__(self, batch_size=20):
+        # None leaves flushing entirely to the caller
+        self.batch_size = batch_size
+        # final path -> temp path, in write order
+        self.pending = {}
+        self.errors = []
+
+    def write(self, path, data):
+        tmp_path = temp_path_for(path)
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        self.pending[path] = tmp_path
+        if self.batch_size and len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        directories = set()
+        for path, tmp_path in pending.items():
+            try:
+                os.replace(tmp_path, path)
+                directories.add(os.path.dirname(path))
+            except OSError as e:
+                self.errors.append(f"{os.path.basename(path)}: {str(e)}")
+        for directory in directories:
+            fsync_dir(directory)
+
+    def close(self):
+        self.flush()
+
+
+class AsyncCardWriter:
+    """Runs another writer on a background thread so rendering can continue.
+
+    The queue is bounded so a slow disk holds back rendering instead of
+    letting finished cards pile up in memory.
+    """
+
+    def __init__(self, writer, max_pending=4):
+        self.writer = writer
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def errors(self):
+        return self.writer.errors
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                path, data = item
+                if path is None:
+                    self.writer.flush()
+                else:
+                    self.writer.write(path, data)
+            except Exception as e:
+                name = os.path.basename(path) if path else 'flush'
+                self.writer.errors.append(f"{name}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def write(self, path, data):
+        self._queue.put((path, data))
+
+    def flush(self):
+        """Block until everything queued so far is written and renamed"""
+        self._queue.put((None, None))
+        self._queue.join()
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,192 @@
+import os
+import json
+from collections import deque
+from fnmatch import fnmatch
+
+# File kinds the pickers ask for
+KIND_PATTERNS = {
+    'csv': ['*.csv'],
+    'image': ['*.png', '*.jpg', '*.jpeg'],
+    'output': ['soil_card_*.pdf'],
+}
+ALL_PATTERNS = [p for patterns in KIND_PATTERNS.values() for p in patterns]
+MAX_DEPTH = 4
+MAX_RECENT = 8
+SKIP_DIRS = {'Android', '__pycache__', 'node_modules'}
+
+
+class FileIndex:
+    """Persistent index of candidate files for the in-app pickers.
+
+    Directories are only re-listed when their mtime changes, so a refresh
+    costs one stat per directory instead of one per file. The scan runs in
+    steps bounded by directory entries, and a large directory is listed
+    across several steps, so it can be driven from the Kivy clock.
+    """
+
+    def __init__(self, index_path, roots):
+        self.index_path = index_path
+        self.roots = [os.path.abspath(r) for r in roots if r and os.path.isdir(r)]
+        # path -> {'mtime': float, 'files': [names], 'dirs': [names]}
+        self.dirs = {}
+        self.recent = []
+        # Bumped whenever the indexed files or their order change
+        self.version = 0
+        self._dirty = False
+        self._queue = deque()
+        self._seen = set()
+        # Directory being listed across steps: (path, depth, mtime, iterator, files, dirs)
+        self._listing = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return
+        self.dirs = state.get('dirs', {})
+        self.recent = [d for d in state.get('recent', []) if os.path.isdir(d)]
+
+    def save(self):
+        """Write the index if it changed since the last save"""
+        if not self._dirty:
+            return
+        state = {'dirs': self.dirs, 'recent': self.recent}
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(state, file)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        except OSError:
+            pass
+
+    def _changed(self):
+        self.version += 1
+        self._dirty = True
+
+    def add_recent(self, directory):
+        directory = os.path.abspath(directory)
+        if self.recent[:1] == [directory]:
+            return
+        if directory in self.recent:
+            self.recent.remove(directory)
+        self.recent.insert(0, directory)
+        del self.recent[MAX_RECENT:]
+        self._changed()
+
+    def start_refresh(self):
+        self._close_listing()
+        self._queue = deque((root, 0) for root in self.recent + self.roots)
+        self._seen = set()
+
+    def refresh_step(self, budget=200):
+        """Process up to budget directory entries; returns True when the scan is complete"""
+        while budget > 0:
+            if self._listing is not None:
+                budget = self._continue_listing(budget)
+                continue
+            if not self._queue:
+                break
+            path, depth = self._queue.popleft()
+            if path in self._seen:
+                continue
+            self._seen.add(path)
+            budget -= 1
+            self._start_dir(path, depth)
+        if self._queue or self._listing is not None:
+            return False
+        # Forget directories that disappeared or are no longer reachable
+        for path in list(self.dirs):
+            if path not in self._seen:
+                del self.dirs[path]
+                self._changed()
+        self.save()
+        return True
+
+    def _start_dir(self, path, depth):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._forget(path)
+            return
+        entry = self.dirs.get(path)
+        if entry is not None and entry['mtime'] == mtime:
+            self._enqueue_children(path, depth, entry['dirs'])
+            return
+        try:
+            iterator = os.scandir(path)
+        except OSError:
+            self._forget(path)
+            return
+        self._listing = (path, depth, mtime, iterator, [], [])
+
+    def _continue_listing(self, budget):
+        path, depth, mtime, iterator, files, dirs = self._listing
+        try:
+            while budget > 0:
+                item = next(iterator, None)
+                if item is None:
+                    break
+                budget -= 1
+                if item.name.startswith('.'):
+                    continue
+                try:
+                    if item.is_dir():
+                        if item.name not in SKIP_DIRS:
+                            dirs.append(item.name)
+                    elif any(fnmatch(item.name.lower(), p) for p in ALL_PATTERNS):
+                        files.append(item.name)
+                except OSError:
+                    continue
+            else:
+                return budget
+        except OSError:
+            self._close_listing()
+            self._forget(path)
+            return budget
+        self._close_listing()
+        entry = {'mtime': mtime, 'files': sorted(files), 'dirs': sorted(dirs)}
+        old = self.dirs.get(path)
+        if old is None or old['files'] != entry['files'] or old['dirs'] != entry['dirs']:
+            self._changed()
+        else:
+            # Only the mtime moved; remember it so the next refresh skips the listing
+            self._dirty = True
+        self.dirs[path] = entry
+        self._enqueue_children(path, depth, entry['dirs'])
+        return budget
+
+    def _close_listing(self):
+        if self._listing is not None:
+            self._listing[3].close()
+            self._listing = None
+
+    def _enqueue_children(self, path, depth, names):
+        if depth < MAX_DEPTH:
+            for name in names:
+                self._queue.append((os.path.join(path, name), depth + 1))
+
+    def _forget(self, path):
+        if self.dirs.pop(path, None) is not None:
+            self._changed()
+
+    def _ordered_dirs(self):
+        # Recently used directories first, then the rest alphabetically
+        rest = sorted(d for d in self.dirs if d not in self.recent)
+        return [d for d in self.recent if d in self.dirs] + rest
+
+    def files(self, kind, offset=0, limit=None):
+        patterns = KIND_PATTERNS[kind]
+        matches = []
+        for directory in self._ordered_dirs():
+            for name in self.dirs[directory]['files']:
+                if any(fnmatch(name.lower(), p) for p in patterns):
+                    matches.append(os.path.join(directory, name))
+        end = None if limit is None else offset + limit
+        return matches[offset:end]
+
+    def directories(self, offset=0, limit=None):
+        end = None if limit is None else offset + limit
+        return self._ordered_dirs()[offset:end]
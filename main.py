@@ -6,7 +6,6 @@ from kivy.uix.gridlayout import GridLayout
 from kivymd.uix.button import MDRaisedButton
 from kivymd.uix.dialog import MDDialog
 from kivy.uix.screenmanager import ScreenManager, Screen
-from kivy.uix.filechooser import FileChooserIconView
 from kivy.uix.scrollview import ScrollView
 from kivy.properties import StringProperty
 from kivy.uix.image import Image
@@ -16,7 +15,22 @@ import sys
 import subprocess
 
 # Local generator
-from soil_card_generator import SoilHealthCardGenerator
+from soil_card_generator import SoilHealthCardGenerator, BulkCardJob, RECOMMENDATION_NUTRIENTS
+from file_index import FileIndex
+
+# On-device bulk scheduling: small batches with pauses so long runs don't
+# drain the battery, overheat the phone or get killed for memory
+BULK_BATCH_SIZE = 5
+BULK_BATCH_PAUSE = 0.5
+BULK_BACKOFF_PAUSE = 30
+LOW_BATTERY_PERCENT = 20
+
+# Rows added to a picker per page
+PICKER_PAGE_SIZE = 30
+
+# Seconds of typing inactivity before the card preview refreshes
+PREVIEW_DEBOUNCE = 0.3
+REC_COLUMNS = ['soil_conditioner', 'fertilizer_combo_1', 'fertilizer_combo_2']
 
 # Small helpers
 
@@ -33,6 +47,70 @@ def get_nutrient_status_simple(value, nutrient_type, generator_instance):
     return 'unknown'
 
 
+def device_needs_rest():
+    """True when the battery is low and not charging, or the device is throttling"""
+    if not ANDROID:
+        return False
+    try:
+        from plyer import battery
+        status = battery.status
+        percentage = status.get('percentage')
+        if not status.get('isCharging') and percentage is not None and percentage < LOW_BATTERY_PERCENT:
+            return True
+    except Exception:
+        pass
+    # plyer has no thermal facade; PowerManager.getCurrentThermalStatus needs API 29+
+    try:
+        power_manager = PythonActivity.mActivity.getSystemService(Context.POWER_SERVICE)
+        PowerManager = autoclass('android.os.PowerManager')
+        if power_manager.getCurrentThermalStatus() >= PowerManager.THERMAL_STATUS_MODERATE:
+            return True
+    except Exception:
+        pass
+    return False
+
+
+def picker_roots():
+    """Directories the file index starts from"""
+    roots = [os.path.expanduser("~")]
+    if ANDROID:
+        for getter in ('get_documents_dir', 'get_downloads_dir', 'get_pictures_dir', 'get_external_storage_dir'):
+            try:
+                roots.append(getattr(storagepath, getter)())
+            except Exception:
+                pass
+    return roots
+
+
+def open_pdf(filepath):
+    """Open a generated card in the system PDF viewer"""
+    # On Android, use a share intent to open the file
+    if ANDROID:
+        try:
+            # Use FileProvider to get a content URI, required for API 24+
+            context = cast('android.content.Context', PythonActivity.mActivity.getApplicationContext())
+            file_provider_auth = f"{context.getPackageName()}.fileprovider"
+            uri = FileProvider.getUriForFile(context, file_provider_auth, File(filepath))
+            
+            share_intent = Intent(Intent.ACTION_VIEW)
+            share_intent.setDataAndType(uri, "application/pdf")
+            share_intent.setFlags(Intent.FLAG_ACTIVITY_NEW_TASK)
+            share_intent.addFlags(Intent.FLAG_GRANT_READ_URI_PERMISSION)
+            
+            current_activity = cast('android.app.Activity', PythonActivity.mActivity)
+            current_activity.startActivity(share_intent)
+        except Exception as e_intent:
+            # Fallback for older APIs or different setups
+            dlg = MDDialog(title="Android Error", text=f"Could not open PDF automatically. Please find it in your Documents folder.\nError: {e_intent}")
+            dlg.open()
+    else: # Desktop fallback
+        if hasattr(os, 'startfile'):
+            os.startfile(filepath)
+        else:
+            opener = 'open' if sys.platform == 'darwin' else 'xdg-open'
+            subprocess.Popen([opener, filepath])
+
+
 def generate_recommendations(nutrients, crop_type, generator_instance):
     recommendations = {
         'soil_conditioner': [],
@@ -76,6 +154,156 @@ def generate_recommendations(nutrients, crop_type, generator_instance):
     return recommendations
 
 
+class IndexedFilePicker(MDBoxLayout):
+    """File or directory picker backed by the app's FileIndex.
+
+    Unlike FileChooserIconView it never lists directories itself, and only
+    one page of rows is created at a time.
+    """
+
+    def __init__(self, file_index, kind=None, **kwargs):
+        super().__init__(orientation='vertical', **kwargs)
+        from kivy.uix.label import Label as KivyLabel
+        self.file_index = file_index
+        # None picks directories, otherwise a FileIndex kind such as 'csv'
+        self.kind = kind
+        self.selection = []
+        # Paths currently shown, in order; None until the first load
+        self.paths = None
+
+        self.selected_label = KivyLabel(text="Nothing selected", size_hint_y=None, height=30, shorten=True)
+        self.add_widget(self.selected_label)
+
+        self.rows = GridLayout(cols=1, size_hint_y=None)
+        self.rows.bind(minimum_height=self.rows.setter('height'))
+        sv = ScrollView(size_hint=(1, 1))
+        sv.add_widget(self.rows)
+        self.add_widget(sv)
+
+        self.more_btn = MDRaisedButton(text="Show more", size_hint=(1, None), height=40)
+        self.more_btn.bind(on_release=lambda x: self.load_page())
+        self.add_widget(self.more_btn)
+        self.reload()
+
+    def entries(self, offset, limit):
+        if self.kind is None:
+            return self.file_index.directories(offset, limit)
+        return self.file_index.files(self.kind, offset, limit)
+
+    def reload(self):
+        """Rebuild the rows, unless the index still gives the same paths"""
+        # Keep as many rows as were already paged in
+        count = max(len(self.paths or []), PICKER_PAGE_SIZE)
+        paths = self.entries(0, count)
+        if paths == self.paths:
+            return
+        self.rows.clear_widgets()
+        self.paths = []
+        self._add_rows(paths, count)
+
+    def load_page(self, count=PICKER_PAGE_SIZE):
+        self._add_rows(self.entries(len(self.paths), count), count)
+
+    def _add_rows(self, paths, count):
+        from kivy.uix.button import Button
+        for path in paths:
+            text = path if self.kind is None else f"{os.path.basename(path)}  ({os.path.dirname(path)})"
+            row = Button(text=text, size_hint_y=None, height=40, shorten=True, halign='left')
+            row.bind(size=row.setter('text_size'))
+            row.bind(on_release=lambda x, p=path: self.select(p))
+            self.rows.add_widget(row)
+        self.paths.extend(paths)
+        self.more_btn.disabled = len(paths) < count
+
+    def select(self, path):
+        self.selection = [path]
+        self.selected_label.text = path
+        self.file_index.add_recent(path if self.kind is None else os.path.dirname(path))
+
+
+class CardPreview(MDBoxLayout):
+    """In-app mirror of the PDF card built from widgets that are kept alive.
+
+    Each nutrient row and recommendation cell is updated in place, so a
+    refresh only touches the labels whose text actually changed.
+    """
+
+    def __init__(self, generator, **kwargs):
+        super().__init__(orientation='vertical', size_hint_y=None, spacing=4, **kwargs)
+        from kivy.uix.label import Label as KivyLabel
+        self.bind(minimum_height=self.setter('height'))
+        self.generator = generator
+
+        self.title_label = KivyLabel(text="SOIL HEALTH CARD", bold=True, size_hint_y=None, height=28)
+        self.add_widget(self.title_label)
+        self.details_label = KivyLabel(text="", size_hint_y=None, height=60, font_size='12sp')
+        self.add_widget(self.details_label)
+
+        table = GridLayout(cols=4, size_hint_y=None, spacing=2)
+        table.bind(minimum_height=table.setter('height'))
+        for heading in ("Nutrient", "Value", "Range (L-M-H)", "Status"):
+            table.add_widget(KivyLabel(text=heading, bold=True, size_hint_y=None, height=24, font_size='11sp'))
+        # nutrient -> (value label, range label, status label)
+        self.nutrient_rows = {}
+        for key in generator.nutrient_ranges:
+            table.add_widget(KivyLabel(text=key.replace('_', ' ').title(), size_hint_y=None, height=22, font_size='11sp'))
+            value_lbl = KivyLabel(text="-", size_hint_y=None, height=22, font_size='11sp')
+            table.add_widget(value_lbl)
+            range_lbl = KivyLabel(text=generator.range_text(key), size_hint_y=None, height=22, font_size='10sp')
+            table.add_widget(range_lbl)
+            status_lbl = KivyLabel(text="", size_hint_y=None, height=22, font_size='11sp')
+            table.add_widget(status_lbl)
+            self.nutrient_rows[key] = (value_lbl, range_lbl, status_lbl)
+        self.add_widget(table)
+
+        self.add_widget(KivyLabel(text="RECOMMENDATIONS", bold=True, size_hint_y=None, height=28))
+        self.rec_table = GridLayout(cols=3, size_hint_y=None, spacing=2)
+        self.rec_table.bind(minimum_height=self.rec_table.setter('height'))
+        for heading in ("SOIL AMENDMENT", "FERTILIZER COMBO 1", "FERTILIZER COMBO 2"):
+            self.rec_table.add_widget(KivyLabel(text=heading, bold=True, size_hint_y=None, height=24, font_size='10sp'))
+        # One list of labels per row, grown as needed and reused afterwards
+        self.rec_rows = []
+        self.add_widget(self.rec_table)
+
+    def set_details(self, data):
+        self.details_label.text = (f"{data.get('farmer_name', '')}  |  Test ID: {data.get('test_id', '')}\n"
+                                   f"Crop: {data.get('selected_crop', '') or 'N/A'}  |  Survey No.: {data.get('survey_no', '')}")
+
+    def update_nutrient(self, key, value):
+        value_lbl, range_lbl, status_lbl = self.nutrient_rows[key]
+        # Thresholds may have changed through update_nutrient_range
+        range_text = self.generator.range_text(key)
+        if range_lbl.text != range_text:
+            range_lbl.text = range_text
+        if value is None:
+            value_lbl.text = "-"
+            status_lbl.text = ""
+            return
+        # Half-typed values would only crowd out real profiles in the memo
+        status = self.generator.get_nutrient_status(key, value, use_memo=False)
+        value_lbl.text = f"{value} {self.generator.nutrient_ranges[key]['unit']}"
+        status_lbl.text = status
+        r, g, b = self.generator.status_color(status)
+        status_lbl.color = (r / 255, g / 255, b / 255, 1)
+
+    def update_recommendations(self, recommendations):
+        from kivy.uix.label import Label as KivyLabel
+        row_count = max(max(len(recommendations[c]) for c in REC_COLUMNS), 1)
+        while len(self.rec_rows) < row_count:
+            cells = [KivyLabel(text="", size_hint_y=None, height=22, font_size='10sp') for _ in REC_COLUMNS]
+            for cell in cells:
+                self.rec_table.add_widget(cell)
+            self.rec_rows.append(cells)
+        for i, cells in enumerate(self.rec_rows):
+            for column, cell in zip(REC_COLUMNS, cells):
+                items = recommendations[column]
+                text = items[i] if i < len(items) else ""
+                if cell.text != text:
+                    cell.text = text
+                cell.opacity = 1 if i < row_count else 0
+                cell.height = 22 if i < row_count else 0
+
+
 class CardDetailsScreen(Screen):
     def __init__(self, app, **kwargs):
         super().__init__(**kwargs)
@@ -130,6 +358,7 @@ class NutrientsScreen(Screen):
         for key, params in self.app.generator.nutrient_ranges.items():
             form.add_widget(KivyLabel(text=f"{key.replace('_', ' ').title()} ({params['unit']})", size_hint_y=None, height=40))
             ti = KivyTextInput(multiline=False, size_hint_y=None, height=40)
+            ti.bind(text=lambda instance, text, k=key: self.queue_preview(k))
             self.inputs[key] = ti
             form.add_widget(ti)
 
@@ -140,24 +369,62 @@ class NutrientsScreen(Screen):
         gen_btn = MDRaisedButton(text="Generate PDF", size_hint=(1, None), height=48)
         gen_btn.bind(on_release=self.generate_pdf)
 
-        # Wrap the form in a ScrollView for portrait phones
+        # Form and live preview sit side by side in landscape, stacked in portrait
+        self.body = MDBoxLayout(orientation='vertical', spacing=10)
         sv = ScrollView(size_hint=(1, 1))
         sv.add_widget(form)
-        outer.add_widget(sv)
+        self.body.add_widget(sv)
+        self.preview = CardPreview(self.app.generator)
+        preview_sv = ScrollView(size_hint=(1, 1))
+        preview_sv.add_widget(self.preview)
+        self.body.add_widget(preview_sv)
+        self.bind(size=self._update_orientation)
+        outer.add_widget(self.body)
         outer.add_widget(gen_btn)
         self.add_widget(outer)
 
-    def generate_pdf(self, instance):
+        self._dirty = set()
+        self._preview_trigger = Clock.create_trigger(self.refresh_preview, PREVIEW_DEBOUNCE)
+
+    def _update_orientation(self, *args):
+        self.body.orientation = 'horizontal' if self.width > self.height else 'vertical'
+
+    def on_pre_enter(self, *args):
+        self.preview.set_details(self.app.data)
+        # Crop may have changed on the details screen, so redo everything
+        self._dirty.update(self.inputs)
+        self.refresh_preview()
+
+    def read_nutrients(self):
+        nutrients = {}
         for k, v in self.inputs.items():
             try:
-                self.app.nutrients[k] = float(v.text) if v.text else None
+                nutrients[k] = float(v.text) if v.text else None
             except ValueError:
-                self.app.nutrients[k] = None
+                nutrients[k] = None
+        return nutrients
+
+    def queue_preview(self, key):
+        self._dirty.add(key)
+        self._preview_trigger()
+
+    def refresh_preview(self, *args):
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        nutrients = self.read_nutrients()
+        for key in dirty:
+            self.preview.update_nutrient(key, nutrients[key])
+        if dirty & RECOMMENDATION_NUTRIENTS:
+            recommendations = self.app.generator.generate_recommendations(
+                nutrients, self.app.data.get('selected_crop', ''), use_memo=False)
+            self.preview.update_recommendations(recommendations)
+
+    def generate_pdf(self, instance):
+        self.app.nutrients.update(self.read_nutrients())
         self.app.remarks = self.remarks_input.text
         try:
-            farmer_name = self.app.data.get('farmer_name', '').strip() or 'user'
-            safe_name = "".join(c for c in farmer_name if c.isalnum() or c in (' ', '_', '-')).rstrip()
-            filename = f"soil_card_{safe_name}.pdf"
+            filename = self.app.generator.card_filename(self.app.data)
 
             # Use a safe, public directory on Android
             if ANDROID:
@@ -173,31 +440,7 @@ class NutrientsScreen(Screen):
             filepath = os.path.join(documents_dir, filename)
             self.app.generator.create_pdf_card(filepath, self.app.data, self.app.nutrients, self.app.remarks)
 
-            # On Android, use a share intent to open the file
-            if ANDROID:
-                try:
-                    # Use FileProvider to get a content URI, required for API 24+
-                    context = cast('android.content.Context', PythonActivity.mActivity.getApplicationContext())
-                    file_provider_auth = f"{context.getPackageName()}.fileprovider"
-                    uri = FileProvider.getUriForFile(context, file_provider_auth, File(filepath))
-                    
-                    share_intent = Intent(Intent.ACTION_VIEW)
-                    share_intent.setDataAndType(uri, "application/pdf")
-                    share_intent.setFlags(Intent.FLAG_ACTIVITY_NEW_TASK)
-                    share_intent.addFlags(Intent.FLAG_GRANT_READ_URI_PERMISSION)
-                    
-                    current_activity = cast('android.app.Activity', PythonActivity.mActivity)
-                    current_activity.startActivity(share_intent)
-                except Exception as e_intent:
-                    # Fallback for older APIs or different setups
-                    dlg = MDDialog(title="Android Error", text=f"Could not open PDF automatically. Please find it in your Documents folder.\nError: {e_intent}")
-                    dlg.open()
-            else: # Desktop fallback
-                if hasattr(os, 'startfile'):
-                    os.startfile(filepath)
-                else:
-                    opener = 'open' if sys.platform == 'darwin' else 'xdg-open'
-                    subprocess.Popen([opener, filepath])
+            open_pdf(filepath)
 
             self.app.done_screen.set_message(f"PDF generated:\n{filepath}")
             self.app.sm.current = 'done'
@@ -218,35 +461,115 @@ class BulkScreen(Screen):
 
         outer.add_widget(KivyLabel(text="Bulk CSV Generator", size_hint_y=None, height=30))
 
-        # Restrict file chooser to the user's home directory to avoid permission errors
-        user_home = os.path.expanduser("~")
-        self.csv_chooser = FileChooserIconView(filters=['*.csv'], size_hint_y=0.4, path=user_home, rootpath=user_home)
-        outer.add_widget(self.csv_chooser)
+        self.csv_picker = IndexedFilePicker(self.app.file_index, kind='csv', size_hint_y=0.4)
+        outer.add_widget(self.csv_picker)
+
+        self.dir_picker = IndexedFilePicker(self.app.file_index, size_hint_y=0.4)
+        outer.add_widget(self.dir_picker)
+
+        from kivy.uix.checkbox import CheckBox
+        saver_row = MDBoxLayout(orientation='horizontal', size_hint_y=None, height=40)
+        self.saver_check = CheckBox(active=ANDROID, size_hint_x=None, width=40)
+        saver_row.add_widget(self.saver_check)
+        saver_row.add_widget(KivyLabel(text="Battery saver (small batches, resumable)"))
+        outer.add_widget(saver_row)
+
+        self.status_label = KivyLabel(text="", size_hint_y=None, height=30)
+        outer.add_widget(self.status_label)
 
-        self.dir_chooser = FileChooserIconView(dirselect=True, size_hint_y=0.4, path=user_home, rootpath=user_home)
-        outer.add_widget(self.dir_chooser)
+        self.bulk_btn = MDRaisedButton(text="Generate Bulk PDFs from CSV", size_hint=(1, None), height=48)
+        self.bulk_btn.bind(on_release=self.generate_bulk)
+        outer.add_widget(self.bulk_btn)
 
-        btn = MDRaisedButton(text="Generate Bulk PDFs from CSV", size_hint=(1, None), height=48)
-        btn.bind(on_release=self.generate_bulk)
-        outer.add_widget(btn)
+        self.cancel_btn = MDRaisedButton(text="Cancel (resume later)", size_hint=(1, None), height=48, disabled=True)
+        self.cancel_btn.bind(on_release=self.cancel_bulk)
+        outer.add_widget(self.cancel_btn)
         self.add_widget(outer)
+        self.job = None
+
+    def on_pre_enter(self, *args):
+        self.app.refresh_file_index()
 
     def generate_bulk(self, instance):
-        csv_files = getattr(self, 'csv_chooser', None) and self.csv_chooser.selection or []
-        dirs = getattr(self, 'dir_chooser', None) and self.dir_chooser.selection or []
+        csv_files = self.csv_picker.selection
+        dirs = self.dir_picker.selection
         if not csv_files or not dirs:
             dlg = MDDialog(title="Input Missing", text="Please select both a CSV file and an output directory.")
             dlg.open()
             return
         csv_path = csv_files[0]
         output_dir = dirs[0]
-        count, errors = self.app.generator.generate_bulk_cards(csv_path, output_dir)
+        if self.saver_check.active:
+            self.start_batched(csv_path, output_dir)
+            return
+        count, errors, duplicates = self.app.generator.generate_bulk_cards(csv_path, output_dir)
+        self.show_result(count, errors, output_dir, duplicates)
+
+    def start_batched(self, csv_path, output_dir):
+        try:
+            self.job = BulkCardJob(self.app.generator, csv_path, output_dir)
+        except Exception as e:
+            # Don't report the previous run's reuse figures
+            self.app.generator.reset_memo_stats()
+            self.show_result(0, [f"Failed to read CSV: {str(e)}"], output_dir)
+            return
+        if self.job.index:
+            self.status_label.text = f"Resuming at row {self.job.index}..."
+        self.bulk_btn.disabled = True
+        self.cancel_btn.disabled = False
+        Clock.schedule_once(self.run_next_batch, 0)
+
+    def cancel_bulk(self, instance):
+        job = self.job
+        if job is None:
+            return
+        # The checkpoint lets the next run with the same CSV pick up from here
+        Clock.unschedule(self.run_next_batch)
+        job.close()
+        self.job = None
+        self.bulk_btn.disabled = False
+        self.cancel_btn.disabled = True
+        self.status_label.text = f"Cancelled after {job.count} cards; run again to resume"
+
+    def run_next_batch(self, dt):
+        job = self.job
+        if job is None:
+            return
+        if device_needs_rest():
+            self.status_label.text = f"Paused to save battery/cool down ({job.count} done)"
+            Clock.schedule_once(self.run_next_batch, BULK_BACKOFF_PAUSE)
+            return
+        try:
+            finished = job.run_batch(BULK_BATCH_SIZE)
+        except Exception as e:
+            # close() also merges errors from the writer's final flush
+            job.close()
+            job.errors.append(f"Row {job.index}: {str(e)}")
+            finished = True
+        if not finished:
+            self.status_label.text = f"Generated {job.count} cards..."
+            Clock.schedule_once(self.run_next_batch, BULK_BATCH_PAUSE)
+            return
+        self.job = None
+        self.bulk_btn.disabled = False
+        self.cancel_btn.disabled = True
+        self.status_label.text = ""
+        self.show_result(job.count, job.errors, job.output_dir, job.duplicates)
+
+    def show_result(self, count, errors, output_dir, duplicates=()):
+        profiles = self.app.generator.memo_stats()['recommendations']
+        summary = f"Repeated profiles reused: {profiles['hit_rate']:.0%} ({profiles['hits']}/{profiles['hits'] + profiles['misses']})"
+        if duplicates:
+            summary += f"\n{len(duplicates)} duplicate rows skipped (first: {duplicates[0]})"
         if errors:
             error_details = "\n".join(errors[:4])
-            dlg = MDDialog(title="Bulk Generation Complete", text=f"Generated {count} cards.\n{len(errors)} errors.\nFirst errors:\n{error_details}")
+            dlg = MDDialog(title="Bulk Generation Complete", text=f"Generated {count} cards.\n{len(errors)} errors.\n{summary}\nFirst errors:\n{error_details}")
+            dlg.open()
+        elif duplicates:
+            dlg = MDDialog(title="Bulk Generation Complete", text=f"Generated {count} soil health cards in:\n{output_dir}\n{summary}")
             dlg.open()
         else:
-            dlg = MDDialog(title="Success", text=f"Generated all {count} soil health cards in:\n{output_dir}")
+            dlg = MDDialog(title="Success", text=f"Generated all {count} soil health cards in:\n{output_dir}\n{summary}")
             dlg.open()
 
 
@@ -265,14 +588,24 @@ class SplashScreen(Screen):
 
 
 class DoneScreen(Screen):
-    def __init__(self, **kwargs):
+    def __init__(self, app, **kwargs):
         super().__init__(**kwargs)
+        self.app = app
         outer = MDBoxLayout(orientation='vertical', spacing=10, padding=10)
         from kivy.uix.label import Label as KivyLabel
 
-        self.label = KivyLabel(text="")
+        self.label = KivyLabel(text="", size_hint_y=None, height=60)
         outer.add_widget(self.label)
 
+        # Browse earlier cards without leaving the app
+        outer.add_widget(KivyLabel(text="Generated Cards", size_hint_y=None, height=30))
+        self.output_picker = IndexedFilePicker(self.app.file_index, kind='output')
+        outer.add_widget(self.output_picker)
+
+        open_btn = MDRaisedButton(text="Open Selected Card", size_hint=(1, None), height=48)
+        open_btn.bind(on_release=self.open_selected)
+        outer.add_widget(open_btn)
+
         watermark = KivyLabel(text="Developer: Achu Semy SCA, Tseminyu, Nagaland", size_hint_y=None, height=30)
         outer.add_widget(watermark)
 
@@ -281,9 +614,23 @@ class DoneScreen(Screen):
         outer.add_widget(reset_btn)
         self.add_widget(outer)
 
+    def on_pre_enter(self, *args):
+        self.app.refresh_file_index()
+
     def set_message(self, msg):
         self.label.text = msg
 
+    def open_selected(self, instance):
+        if not self.output_picker.selection:
+            dlg = MDDialog(title="No Card Selected", text="Please select a generated card.")
+            dlg.open()
+            return
+        try:
+            open_pdf(self.output_picker.selection[0])
+        except Exception as e:
+            dlg = MDDialog(title="Error", text=f"Could not open PDF:\n{e}")
+            dlg.open()
+
     def reset_app(self, instance):
         app = MDApp.get_running_app()
         app.data = {}
@@ -308,8 +655,7 @@ class SettingsScreen(Screen):
 
         outer.add_widget(KivyLabel(text="Select Background Image:", size_hint_y=None, height=30))
 
-        user_home = os.path.expanduser("~")
-        self.file_chooser = FileChooserIconView(path=user_home, filters=['*.png', '*.jpg', '*.jpeg'], size_hint_y=0.5)
+        self.file_chooser = IndexedFilePicker(self.app.file_index, kind='image', size_hint_y=0.5)
         outer.add_widget(self.file_chooser)
 
         self.background_image = Image(source=self.background_path, allow_stretch=True, keep_ratio=False)
@@ -321,6 +667,9 @@ class SettingsScreen(Screen):
 
         self.add_widget(outer)
 
+    def on_pre_enter(self, *args):
+        self.app.refresh_file_index()
+
     def apply_background(self, instance):
         if self.file_chooser.selection:
             self.background_path = self.file_chooser.selection[0]
@@ -434,6 +783,34 @@ class SoilHealthCardApp(MDApp):
         self._layout.clear_widgets()
         self._layout.add_widget(self._build_main_ui())
 
+    def refresh_file_index(self):
+        if self._index_event is not None:
+            return
+        self._index_version = self.file_index.version
+        self.file_index.start_refresh()
+        self._index_event = Clock.schedule_interval(self._refresh_file_index_step, 0)
+
+    def _refresh_file_index_step(self, dt):
+        if not self.file_index.refresh_step():
+            return True
+        self._index_event = None
+        if self.file_index.version == self._index_version:
+            return False
+        for picker in (self.bulk_screen.csv_picker, self.bulk_screen.dir_picker, self.settings_screen.file_chooser,
+                       self.done_screen.output_picker):
+            picker.reload()
+        return False
+
+    def on_pause(self):
+        # Recent directories are only kept in memory until here
+        if getattr(self, 'file_index', None) is not None:
+            self.file_index.save()
+        return True
+
+    def on_stop(self):
+        if getattr(self, 'file_index', None) is not None:
+            self.file_index.save()
+
     def _build_main_ui(self):
         # Try to enforce portrait mode on Android; fall back to a portrait window on desktop for testing
         try:
@@ -444,6 +821,9 @@ class SoilHealthCardApp(MDApp):
         except Exception:
             Window.size = (360, 800)
         self.generator = SoilHealthCardGenerator()
+        # Cached index is usable immediately; a refresh runs in the background
+        self.file_index = FileIndex(os.path.join(self.user_data_dir, 'file_index.json'), picker_roots())
+        self._index_event = None
         self.data = {}
         self.nutrients = {}
         self.remarks = ""
@@ -453,7 +833,7 @@ class SoilHealthCardApp(MDApp):
         self.card_details_screen = CardDetailsScreen(self, name='card')
         self.nutrients_screen = NutrientsScreen(self, name='nutrients')
         self.bulk_screen = BulkScreen(self, name='bulk')
-        self.done_screen = DoneScreen(name='done')
+        self.done_screen = DoneScreen(self, name='done')
         self.settings_screen = SettingsScreen(app=self, name='settings')
 
         # Add splash first so it shows on startup
@@ -467,6 +847,7 @@ class SoilHealthCardApp(MDApp):
         # show splash first, then switch to main card screen after 3 seconds
         self.sm.current = 'splash'
         Clock.schedule_once(lambda dt: setattr(self.sm, 'current', 'card'), 3)
+        self.refresh_file_index()
 
         # Some KivyMD versions may not expose MDToolbar under the same path.
         # Use a simple MD header (MDLabel inside an MDBoxLayout) to avoid compatibility issues.
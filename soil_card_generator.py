@@ -2,9 +2,40 @@ from fpdf2 import FPDF
 from datetime import datetime
 import os
 import csv
+import gc
+import json
+import hashlib
+from collections import OrderedDict
+from types import MappingProxyType
+from itertools import islice
+
+from card_writer import AtomicCardWriter, AsyncCardWriter, write_atomic, remove_stale_temp_files
+
+# Checkpoint file written next to the generated cards by BulkCardJob
+CHECKPOINT_NAME = '.soil_card_checkpoint.json'
+DETAIL_FIELDS = ['farmer_name', 'center_name', 'address', 'test_id',
+                 'testing_date', 'survey_no', 'farmer_address', 'selected_crop']
+# Nutrients that generate_recommendations looks at. The recommendation memo
+# is keyed on exactly these, and _compute_recommendations refuses to read any
+# other nutrient, so the two can't drift apart silently.
+RECOMMENDATION_NUTRIENTS = {'ph', 'organic_carbon', 'nitrogen', 'phosphorus', 'potassium',
+                            'zinc', 'boron', 'iron'}
+# Decimal places labs report each nutrient to; memo keys are rounded to these
+LAB_PRECISION = {
+    'nitrogen': 1, 'phosphorus': 1, 'potassium': 1, 'ph': 2,
+    'electrical_conductivity': 2, 'organic_carbon': 2, 'sulphur': 2, 'zinc': 2,
+    'boron': 2, 'iron': 2, 'manganese': 2, 'copper': 2
+}
+# Results kept per memo kind before LRU eviction; separate bounds so the
+# many per-nutrient status entries can't push out whole profiles
+MEMO_SIZES = {'status': 128, 'recommendations': 256}
 
 class SoilHealthCardGenerator:
     def __init__(self):
+        # memo kind -> OrderedDict in LRU order
+        self._memo = {kind: OrderedDict() for kind in MEMO_SIZES}
+        # memo kind -> [hits, misses]
+        self._memo_counts = {'status': [0, 0], 'recommendations': [0, 0]}
         # 12 nutrients with ranges and units
         self.nutrient_ranges = {
             'nitrogen': {'low': 280, 'medium': 560, 'unit': 'kg/ha'},
@@ -21,7 +52,78 @@ class SoilHealthCardGenerator:
             'copper': {'low': 0.2, 'medium': 0.4, 'unit': 'mg/kg'}
         }
 
-    def get_nutrient_status(self, nutrient_key, value):
+    @property
+    def nutrient_ranges(self):
+        return self._nutrient_ranges
+
+    @nutrient_ranges.setter
+    def nutrient_ranges(self, ranges):
+        # Read-only so every change comes back through here and drops the memo
+        self._nutrient_ranges = MappingProxyType({k: MappingProxyType(dict(v)) for k, v in ranges.items()})
+        self.clear_memo()
+
+    def update_nutrient_range(self, nutrient_key, **values):
+        """Change some of a nutrient's thresholds, e.g. update_nutrient_range('zinc', low=0.8)"""
+        ranges = {k: dict(v) for k, v in self._nutrient_ranges.items()}
+        ranges[nutrient_key].update(values)
+        self.nutrient_ranges = ranges
+
+    def clear_memo(self):
+        for memo in self._memo.values():
+            memo.clear()
+
+    def reset_memo_stats(self):
+        for counts in self._memo_counts.values():
+            counts[0] = counts[1] = 0
+
+    def memo_stats(self):
+        """Hits, misses and hit rate for each memo kind ('status', 'recommendations')"""
+        stats = {}
+        for kind, (hits, misses) in self._memo_counts.items():
+            lookups = hits + misses
+            stats[kind] = {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else 0.0,
+                           'size': len(self._memo[kind])}
+        return stats
+
+    def _memo_value(self, nutrient_key, value):
+        """Memo key part for one value; raises ValueError if it can't be keyed exactly"""
+        if value is None:
+            return None
+        if not isinstance(value, (int, float)) or nutrient_key not in LAB_PRECISION:
+            raise ValueError(value)
+        quantized = round(float(value), LAB_PRECISION[nutrient_key])
+        # Values finer than lab precision could sit either side of a threshold
+        if quantized != value:
+            raise ValueError(value)
+        return quantized
+
+    def _memoized(self, kind, key, compute):
+        memo = self._memo[kind]
+        counts = self._memo_counts[kind]
+        try:
+            result = memo[key]
+        except KeyError:
+            counts[1] += 1
+            result = compute()
+            memo[key] = result
+            if len(memo) > MEMO_SIZES[kind]:
+                memo.popitem(last=False)
+            return result
+        counts[0] += 1
+        memo.move_to_end(key)
+        return result
+
+    def get_nutrient_status(self, nutrient_key, value, use_memo=True):
+        """use_memo=False suits one-off lookups such as half-typed preview values"""
+        if not use_memo:
+            return self._compute_nutrient_status(nutrient_key, value)
+        try:
+            key = (nutrient_key, self._memo_value(nutrient_key, value))
+        except ValueError:
+            return self._compute_nutrient_status(nutrient_key, value)
+        return self._memoized('status', key, lambda: self._compute_nutrient_status(nutrient_key, value))
+
+    def _compute_nutrient_status(self, nutrient_key, value):
         if value is None or value == '':
             return 'NOT AVAILABLE'
         try:
@@ -36,7 +138,21 @@ class SoilHealthCardGenerator:
         except (ValueError, KeyError):
             return 'NOT AVAILABLE'
 
-    def create_pdf_card(self, file_path, data, nutrients, custom_remarks=""):
+    def status_color(self, status):
+        """RGB (0-255) used to print a nutrient status"""
+        if 'LOW' in status:
+            return (255, 0, 0)  # Red
+        elif 'HIGH' in status:
+            return (0, 128, 0)  # Green
+        elif 'MEDIUM' in status:
+            return (255, 165, 0)  # Orange
+        return (128, 128, 128)  # Grey
+
+    def range_text(self, nutrient_key):
+        ranges = self.nutrient_ranges[nutrient_key]
+        return f"<{ranges['low']} | {ranges['low']}-{ranges['medium']} | >{ranges['medium']}"
+
+    def create_pdf_card(self, file_path, data, nutrients, custom_remarks="", writer=None):
         pdf = FPDF()
         pdf.add_page()
         
@@ -91,18 +207,11 @@ class SoilHealthCardGenerator:
             if value is not None and value != '':
                 label = key.replace('_', ' ').title()
                 unit = ranges['unit']
-                range_text = f"<{ranges['low']} | {ranges['low']}-{ranges['medium']} | >{ranges['medium']}"
+                range_text = self.range_text(key)
                 status = self.get_nutrient_status(key, value)
                 
                 # Color based on status
-                if 'LOW' in status:
-                    pdf.set_text_color(255, 0, 0)  # Red
-                elif 'HIGH' in status:
-                    pdf.set_text_color(0, 128, 0)  # Green
-                elif 'MEDIUM' in status:
-                    pdf.set_text_color(255, 165, 0)  # Orange
-                else:
-                    pdf.set_text_color(128, 128, 128)  # Grey
+                pdf.set_text_color(*self.status_color(status))
                 
                 pdf.cell(45, 6, label, 1, 0)
                 pdf.cell(25, 6, f"{value} {unit}", 1, 0)
@@ -157,10 +266,32 @@ class SoilHealthCardGenerator:
         pdf.set_font("Arial", 'I', 10)
         pdf.cell(0, 6, "Developer: Achu Semy (SCA, Tseminyu, Nagaland)", 0, 1, 'C')
 
-        # Save the PDF
-        pdf.output(file_path)
+        # Save the PDF; never write straight to the final name
+        if writer is None:
+            write_atomic(file_path, pdf.output())
+        else:
+            writer.write(file_path, pdf.output())
+
+    def generate_recommendations(self, nutrients, crop_type, use_memo=True):
+        if not use_memo:
+            return self._compute_recommendations(nutrients, crop_type)
+        crop_lower = crop_type.lower() if crop_type else 'rice'
+        try:
+            profile = tuple(self._memo_value(k, nutrients.get(k)) for k in sorted(RECOMMENDATION_NUTRIENTS))
+        except ValueError:
+            return self._compute_recommendations(nutrients, crop_type)
+        result = self._memoized('recommendations', (crop_lower, profile),
+                                lambda: self._compute_recommendations(nutrients, crop_type))
+        # Callers get their own lists so the cached entry can't be modified
+        return {k: list(v) for k, v in result.items()}
+
+    def _compute_recommendations(self, nutrients, crop_type):
+        def reading(key):
+            # The memo key only covers RECOMMENDATION_NUTRIENTS
+            if key not in RECOMMENDATION_NUTRIENTS:
+                raise KeyError(f"'{key}' must be added to RECOMMENDATION_NUTRIENTS")
+            return nutrients.get(key)
 
-    def generate_recommendations(self, nutrients, crop_type):
         def get_nutrient_status_simple(value, nutrient_type):
             if value is None:
                 return 'unknown'
@@ -179,20 +310,20 @@ class SoilHealthCardGenerator:
             'fertilizer_combo_2': []
         }
 
-        ph_value = nutrients.get('ph')
+        ph_value = reading('ph')
         if ph_value:
             if ph_value < 5.5:
                 recommendations['soil_conditioner'].append('Lime application @ 2-4 t/ha')
             elif ph_value > 8.5:
                 recommendations['soil_conditioner'].append('Gypsum application @ 2-3 t/ha')
 
-        oc_value = nutrients.get('organic_carbon')
+        oc_value = reading('organic_carbon')
         if oc_value and oc_value < 0.5:
             recommendations['soil_conditioner'].append('FYM/Compost @ 10-12 t/ha')
 
-        n_status = get_nutrient_status_simple(nutrients.get('nitrogen'), 'nitrogen')
-        p_status = get_nutrient_status_simple(nutrients.get('phosphorus'), 'phosphorus')
-        k_status = get_nutrient_status_simple(nutrients.get('potassium'), 'potassium')
+        n_status = get_nutrient_status_simple(reading('nitrogen'), 'nitrogen')
+        p_status = get_nutrient_status_simple(reading('phosphorus'), 'phosphorus')
+        k_status = get_nutrient_status_simple(reading('potassium'), 'potassium')
 
         crop_recommendations = {
             'rice': {'low_n': 'Urea @ 130 kg/ha', 'low_p': 'SSP @ 250 kg/ha', 'low_k': 'MOP @ 100 kg/ha'},
@@ -211,7 +342,7 @@ class SoilHealthCardGenerator:
                 recommendations['fertilizer_combo_1'].append(crop_rec['low_k'])
 
         for nutrient in ['zinc', 'boron', 'iron']:
-            if get_nutrient_status_simple(nutrients.get(nutrient), nutrient) == 'low':
+            if get_nutrient_status_simple(reading(nutrient), nutrient) == 'low':
                 if nutrient == 'zinc': 
                     recommendations['fertilizer_combo_2'].append('Zinc Sulphate @ 25 kg/ha')
                 elif nutrient == 'boron': 
@@ -221,47 +352,190 @@ class SoilHealthCardGenerator:
 
         return recommendations
 
-    def generate_bulk_cards(self, csv_path, output_dir):
-        """Generate bulk PDF cards from CSV file - using pure Python CSV instead of pandas"""
+    def parse_csv_row(self, row):
+        """Split a CSV row into card details and nutrient values"""
+        data = {}
+        nutrients = {}
+        for column, value in row.items():
+            column_lower = column.lower().strip()
+            if column_lower in DETAIL_FIELDS:
+                data[column_lower] = str(value).strip() if value else ''
+            elif column_lower in self.nutrient_ranges:
+                try:
+                    nutrients[column_lower] = float(value) if value else None
+                except ValueError:
+                    nutrients[column_lower] = None
+        return data, nutrients
+
+    def card_filename(self, data, row_index=None):
+        """Name from the sample's identity, so a corrected card replaces the old one.
+
+        The identity is farmer name, test ID and survey number. A CSV row with
+        neither test ID nor survey number also uses its row index, so
+        unidentified samples of the same farmer don't overwrite each other.
+        """
+        farmer_name = data.get('farmer_name', '').strip() or 'farmer'
+        safe_name = "".join(c for c in farmer_name if c.isalnum() or c in (' ', '_', '-')).strip()
+        identity = [farmer_name, data.get('test_id', '').strip(), data.get('survey_no', '').strip()]
+        if not identity[1] and not identity[2] and row_index is not None:
+            identity.append(row_index)
+        digest = hashlib.sha1(json.dumps(identity).encode('utf-8')).hexdigest()[:10]
+        return f"soil_card_{safe_name}_{digest}.pdf"
+
+    def generate_bulk_cards(self, csv_path, output_dir, writer=None):
+        """Generate bulk PDF cards from CSV file - using pure Python CSV instead of pandas
+
+        Returns (count, errors, duplicates); rows naming a sample already seen
+        in the file are skipped and listed in duplicates rather than counted.
+        """
+        if writer is None:
+            writer = AsyncCardWriter(AtomicCardWriter())
+        remove_stale_temp_files(output_dir)
+        self.reset_memo_stats()
         try:
             count = 0
             errors = []
+            duplicates = []
+            # card filename -> first row that produced it
+            seen = {}
             
             with open(csv_path, 'r', encoding='utf-8') as file:
                 csv_reader = csv.DictReader(file)
                 
                 for index, row in enumerate(csv_reader):
                     try:
-                        # Convert row to data dict
-                        data = {}
-                        nutrients = {}
-                        
-                        # Map CSV columns to data fields
-                        for column, value in row.items():
-                            column_lower = column.lower().strip()
-                            if column_lower in ['farmer_name', 'center_name', 'address', 'test_id', 
-                                              'testing_date', 'survey_no', 'farmer_address', 'selected_crop']:
-                                data[column_lower] = str(value).strip() if value else ''
-                            elif column_lower in self.nutrient_ranges:
-                                try:
-                                    nutrients[column_lower] = float(value) if value else None
-                                except ValueError:
-                                    nutrients[column_lower] = None
-                        
-                        # Generate filename
-                        farmer_name = data.get('farmer_name', f'farmer_{index}')
-                        safe_name = "".join(c for c in farmer_name if c.isalnum() or c in (' ', '_', '-')).strip()
-                        filename = f"soil_card_{safe_name}_{index}.pdf"
+                        data, nutrients = self.parse_csv_row(row)
+                        filename = self.card_filename(data, index)
+                        if filename in seen:
+                            duplicates.append(f"Row {index}: same sample as row {seen[filename]}, skipped")
+                            continue
+                        seen[filename] = index
                         filepath = os.path.join(output_dir, filename)
                         
                         # Generate PDF
-                        self.create_pdf_card(filepath, data, nutrients, "")
+                        self.create_pdf_card(filepath, data, nutrients, "", writer=writer)
                         count += 1
                         
                     except Exception as e:
                         errors.append(f"Row {index}: {str(e)}")
-                        
-            return count, errors
+
+            writer.close()
+            errors.extend(writer.errors)
+            return count - len(writer.errors), errors, duplicates
             
         except Exception as e:
-            return 0, [f"Failed to read CSV: {str(e)}"]
+            writer.close()
+            return 0, [f"Failed to read CSV: {str(e)}"], []
+
+
+class BulkCardJob:
+    """Bulk generation in small batches that can be paused and resumed.
+
+    The CSV is streamed, never loaded whole, and progress is checkpointed
+    to the output directory after every batch so a run killed by Android
+    picks up where it stopped instead of starting over.
+    """
+
+    def __init__(self, generator, csv_path, output_dir, resume=True):
+        self.generator = generator
+        self.csv_path = csv_path
+        self.output_dir = output_dir
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+        self.index = 0
+        self.count = 0
+        self.errors = []
+        self.duplicates = []
+        # card filename -> first row that produced it
+        self.seen = {}
+        self.done = False
+        generator.reset_memo_stats()
+        remove_stale_temp_files(output_dir)
+        stat = os.stat(csv_path)
+        # Identifies the CSV so a checkpoint is never applied to a different file
+        self._source = {'csv_path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        if resume:
+            self._load_checkpoint()
+        self._file = open(csv_path, 'r', encoding='utf-8')
+        try:
+            self._reader = csv.DictReader(self._file)
+            # Skip rows already written by an earlier run
+            for _ in islice(self._reader, self.index):
+                pass
+        except Exception:
+            self._file.close()
+            raise
+        # Started last so a failure above can't leave its thread behind
+        self.writer = AsyncCardWriter(AtomicCardWriter(batch_size=None))
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return
+        if state.get('source') != self._source:
+            return
+        self.index = state.get('index', 0)
+        self.count = state.get('count', 0)
+        self.errors = state.get('errors', [])
+        self.duplicates = state.get('duplicates', [])
+        self.seen = state.get('seen', {})
+
+    def checkpoint(self):
+        state = {'source': self._source, 'index': self.index, 'count': self.count, 'errors': self.errors,
+                 'duplicates': self.duplicates, 'seen': self.seen}
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run_batch(self, batch_size):
+        """Generate up to batch_size cards; returns True once the CSV is exhausted"""
+        if self.done:
+            return True
+        processed = 0
+        for row in islice(self._reader, batch_size):
+            try:
+                data, nutrients = self.generator.parse_csv_row(row)
+                filename = self.generator.card_filename(data, self.index)
+                if filename in self.seen:
+                    self.duplicates.append(f"Row {self.index}: same sample as row {self.seen[filename]}, skipped")
+                else:
+                    self.seen[filename] = self.index
+                    filepath = os.path.join(self.output_dir, filename)
+                    self.generator.create_pdf_card(filepath, data, nutrients, "", writer=self.writer)
+                    self.count += 1
+            except Exception as e:
+                self.errors.append(f"Row {self.index}: {str(e)}")
+            self.index += 1
+            processed += 1
+
+        # The checkpoint must never get ahead of the renamed cards
+        self.writer.flush()
+        self._collect_write_errors()
+        # Drop the batch's FPDF objects before the next one starts
+        gc.collect()
+        if processed < batch_size:
+            self.finish()
+        else:
+            self.checkpoint()
+        return self.done
+
+    def finish(self):
+        self.done = True
+        self.close()
+        try:
+            os.remove(self.checkpoint_path)
+        except OSError:
+            pass
+
+    def _collect_write_errors(self):
+        self.count -= len(self.writer.errors)
+        self.errors.extend(self.writer.errors)
+        del self.writer.errors[:]
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            self.writer.close()
+            self._collect_write_errors()
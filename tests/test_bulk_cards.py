@@ -0,0 +1,139 @@
+import csv
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from soil_card_generator import SoilHealthCardGenerator, BulkCardJob, CHECKPOINT_NAME
+except ImportError:  # fpdf2 is only installed in the app build
+    raise unittest.SkipTest("fpdf2 is not installed")
+
+
+class FakePdfGenerator(SoilHealthCardGenerator):
+    """Skips the FPDF render so only naming and bookkeeping are exercised"""
+
+    def __init__(self):
+        super().__init__()
+        self.rendered = []
+
+    def create_pdf_card(self, file_path, data, nutrients, custom_remarks="", writer=None):
+        self.rendered.append(data['farmer_name'])
+        writer.write(file_path, b'%PDF')
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['farmer_name', 'test_id', 'selected_crop', 'nitrogen', 'phosphorus', 'zinc'])
+        writer.writerows(rows)
+
+
+def pdfs(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.pdf'))
+
+
+class BulkCardsTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self._tmp.name, 'samples.csv')
+        self.out = os.path.join(self._tmp.name, 'out')
+        os.mkdir(self.out)
+        self.generator = FakePdfGenerator()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_duplicate_rows_are_reported_not_counted(self):
+        write_csv(self.csv_path, [
+            ['Asha', 'T1', 'rice', 200, 5, 0.5],
+            ['Asha', 'T1', 'rice', 200, 5, 0.5],
+            ['Bela', 'T2', 'rice', 300, 5, 0.5],
+        ])
+        count, errors, duplicates = self.generator.generate_bulk_cards(self.csv_path, self.out)
+        self.assertEqual((count, errors), (2, []))
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(len(pdfs(self.out)), 2)
+
+    def test_job_reports_duplicates(self):
+        write_csv(self.csv_path, [['Asha', 'T1', 'rice', 200, 5, 0.5]] * 3)
+        job = BulkCardJob(self.generator, self.csv_path, self.out)
+        while not job.run_batch(2):
+            pass
+        self.assertEqual((job.count, len(job.duplicates), job.errors), (1, 2, []))
+        self.assertEqual(len(pdfs(self.out)), 1)
+
+    def test_rows_without_test_id_keep_separate_cards(self):
+        write_csv(self.csv_path, [['Asha', '', 'rice', 200, 5, 0.5], ['Asha', '', 'rice', 210, 5, 0.5]])
+        count, errors, duplicates = self.generator.generate_bulk_cards(self.csv_path, self.out)
+        self.assertEqual((count, duplicates), (2, []))
+        self.assertEqual(len(pdfs(self.out)), 2)
+
+    def test_corrected_card_keeps_its_name(self):
+        data = {'farmer_name': 'Asha', 'test_id': 'T1', 'survey_no': '12'}
+        corrected = dict(data, farmer_address='Tseminyu')
+        self.assertEqual(self.generator.card_filename(data), self.generator.card_filename(corrected))
+        self.assertNotEqual(self.generator.card_filename(data),
+                            self.generator.card_filename(dict(data, test_id='T2')))
+
+
+class BulkCardJobCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self._tmp.name, 'samples.csv')
+        self.out = os.path.join(self._tmp.name, 'out')
+        os.mkdir(self.out)
+        self.checkpoint_path = os.path.join(self.out, CHECKPOINT_NAME)
+        self.generator = FakePdfGenerator()
+        write_csv(self.csv_path, [[f'Farmer {i}', f'T{i}', 'rice', 200, 5, 0.5] for i in range(7)])
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_resume_skips_rows_already_written(self):
+        job = BulkCardJob(self.generator, self.csv_path, self.out)
+        job.run_batch(3)
+        job.close()
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+
+        resumed = BulkCardJob(self.generator, self.csv_path, self.out)
+        self.assertEqual((resumed.index, resumed.count), (3, 3))
+        self.generator.rendered = []
+        while not resumed.run_batch(3):
+            pass
+        self.assertEqual(self.generator.rendered, [f'Farmer {i}' for i in range(3, 7)])
+        self.assertEqual(resumed.count, 7)
+        self.assertEqual(len(pdfs(self.out)), 7)
+
+    def test_checkpoint_from_another_csv_is_ignored(self):
+        job = BulkCardJob(self.generator, self.csv_path, self.out)
+        job.run_batch(3)
+        job.close()
+
+        other_csv = os.path.join(self._tmp.name, 'other.csv')
+        write_csv(other_csv, [['Other', 'X1', 'rice', 200, 5, 0.5]])
+        other = BulkCardJob(self.generator, other_csv, self.out)
+        self.assertEqual((other.index, other.count), (0, 0))
+        other.close()
+
+    def test_checkpoint_removed_when_finished(self):
+        job = BulkCardJob(self.generator, self.csv_path, self.out)
+        job.run_batch(3)
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+        while not job.run_batch(3):
+            pass
+        self.assertTrue(job.done)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_missing_csv_leaves_no_writer_thread(self):
+        import threading
+        before = threading.active_count()
+        with self.assertRaises(OSError):
+            BulkCardJob(self.generator, os.path.join(self._tmp.name, 'missing.csv'), self.out)
+        self.assertEqual(threading.active_count(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from card_writer import AtomicCardWriter, AsyncCardWriter, temp_path_for
+
+
+class AtomicCardWriterTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_same_path_twice_in_one_batch_gives_one_file(self):
+        writer = AsyncCardWriter(AtomicCardWriter(batch_size=None))
+        same = os.path.join(self.dir, 'soil_card_Asha_0123456789.pdf')
+        other = os.path.join(self.dir, 'soil_card_Bela_9876543210.pdf')
+        writer.write(same, b'asha')
+        writer.write(same, b'asha')
+        writer.write(other, b'bela')
+        writer.close()
+        self.assertEqual(writer.errors, [])
+        self.assertEqual(sorted(os.listdir(self.dir)), sorted([os.path.basename(same), os.path.basename(other)]))
+
+    def test_nothing_visible_before_flush(self):
+        writer = AtomicCardWriter(batch_size=None)
+        path = os.path.join(self.dir, 'soil_card_x.pdf')
+        writer.write(path, b'data')
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(temp_path_for(path)))
+        writer.flush()
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'data')
+        self.assertFalse(os.path.exists(temp_path_for(path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
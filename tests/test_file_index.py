@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_index import FileIndex
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w'):
+        pass
+
+
+class FileIndexTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, 'home')
+        self.index_path = os.path.join(self._tmp.name, 'index.json')
+        touch(os.path.join(self.root, 'b.csv'))
+        touch(os.path.join(self.root, 'notes.txt'))
+        touch(os.path.join(self.root, 'photos', 'bg.PNG'))
+        touch(os.path.join(self.root, 'out', 'soil_card_Asha_1.pdf'))
+        touch(os.path.join(self.root, '.hidden', 'x.csv'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def refreshed(self, budget=200):
+        index = FileIndex(self.index_path, [self.root])
+        self.refresh(index, budget)
+        return index
+
+    def refresh(self, index, budget=200):
+        index.start_refresh()
+        steps = 1
+        while not index.refresh_step(budget):
+            steps += 1
+        return steps
+
+    def test_indexes_each_kind(self):
+        index = self.refreshed()
+        self.assertEqual(index.files('csv'), [os.path.join(self.root, 'b.csv')])
+        self.assertEqual(index.files('image'), [os.path.join(self.root, 'photos', 'bg.PNG')])
+        self.assertEqual(index.files('output'), [os.path.join(self.root, 'out', 'soil_card_Asha_1.pdf')])
+
+    def test_large_directory_is_listed_across_steps(self):
+        for i in range(50):
+            touch(os.path.join(self.root, 'many', f'{i:02}.csv'))
+        index = FileIndex(self.index_path, [self.root])
+        self.assertGreater(self.refresh(index, budget=5), 10)
+        self.assertEqual(len(index.files('csv')), 51)
+
+    def test_unchanged_directory_is_not_relisted(self):
+        self.refreshed()
+        # A new file with the directory mtime put back looks unchanged
+        mtime = os.stat(self.root).st_mtime
+        touch(os.path.join(self.root, 'new.csv'))
+        os.utime(self.root, (mtime, mtime))
+        index = FileIndex(self.index_path, [self.root])
+        version = index.version
+        self.refresh(index)
+        self.assertNotIn(os.path.join(self.root, 'new.csv'), index.files('csv'))
+        self.assertEqual(index.version, version)
+
+    def test_removed_directory_is_pruned(self):
+        index = self.refreshed()
+        os.remove(os.path.join(self.root, 'photos', 'bg.PNG'))
+        os.rmdir(os.path.join(self.root, 'photos'))
+        self.refresh(index)
+        self.assertEqual(index.files('image'), [])
+        self.assertNotIn(os.path.join(self.root, 'photos'), index.directories())
+
+    def test_paging(self):
+        for i in range(5):
+            touch(os.path.join(self.root, 'batch', f'{i}.csv'))
+        index = self.refreshed()
+        everything = index.files('csv')
+        self.assertEqual(len(everything), 6)
+        self.assertEqual(index.files('csv', 0, 4) + index.files('csv', 4, 4), everything)
+
+    def test_recent_directories_come_first(self):
+        index = self.refreshed()
+        out = os.path.join(self.root, 'out')
+        index.add_recent(out)
+        self.assertEqual(index.directories()[0], out)
+        touch(os.path.join(out, 'z.csv'))
+        self.refresh(index)
+        self.assertEqual(index.files('csv')[0], os.path.join(out, 'z.csv'))
+
+    def test_saves_only_when_changed(self):
+        index = self.refreshed()
+        old = os.stat(self.index_path).st_mtime_ns - 10 ** 9
+        os.utime(self.index_path, ns=(old, old))
+        self.refresh(index)
+        index.add_recent(os.path.join(self.root, 'out'))
+        index.add_recent(os.path.join(self.root, 'out'))
+        self.assertEqual(os.stat(self.index_path).st_mtime_ns, old)
+        index.save()
+        self.assertNotEqual(os.stat(self.index_path).st_mtime_ns, old)
+        reloaded = FileIndex(self.index_path, [self.root])
+        self.assertEqual(reloaded.recent, [os.path.join(self.root, 'out')])
+
+    def test_unchanged_refresh_does_not_write(self):
+        index = self.refreshed()
+        old = os.stat(self.index_path).st_mtime_ns - 10 ** 9
+        os.utime(self.index_path, ns=(old, old))
+        self.refresh(index)
+        self.assertEqual(os.stat(self.index_path).st_mtime_ns, old)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import soil_card_generator
+    from soil_card_generator import SoilHealthCardGenerator
+except ImportError:  # fpdf2 is only installed in the app build
+    raise unittest.SkipTest("fpdf2 is not installed")
+
+
+PROFILE = {'ph': 5.0, 'organic_carbon': 0.4, 'nitrogen': 200.0, 'phosphorus': 5.0,
+           'potassium': 100.0, 'zinc': 0.5, 'boron': 0.4, 'iron': 4.0}
+
+
+class MemoTest(unittest.TestCase):
+    def setUp(self):
+        self.generator = SoilHealthCardGenerator()
+
+    def test_repeated_profile_is_a_hit(self):
+        first = self.generator.generate_recommendations(PROFILE, 'rice')
+        second = self.generator.generate_recommendations(dict(PROFILE), 'Rice')
+        self.assertEqual(first, second)
+        stats = self.generator.memo_stats()['recommendations']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_cached_result_cannot_be_modified_by_callers(self):
+        self.generator.generate_recommendations(PROFILE, 'rice')['fertilizer_combo_1'].clear()
+        self.assertTrue(self.generator.generate_recommendations(PROFILE, 'rice')['fertilizer_combo_1'])
+
+    def test_update_nutrient_range_invalidates(self):
+        self.assertEqual(self.generator.get_nutrient_status('nitrogen', 200.0), 'LOW, DEFICIENT')
+        self.generator.update_nutrient_range('nitrogen', low=100)
+        self.assertEqual(self.generator.get_nutrient_status('nitrogen', 200.0), 'MEDIUM, NEUTRAL')
+        self.assertNotIn('Urea @ 130 kg/ha',
+                         self.generator.generate_recommendations(PROFILE, 'rice')['fertilizer_combo_1'])
+
+    def test_setter_invalidates(self):
+        self.generator.generate_recommendations(PROFILE, 'rice')
+        ranges = {k: dict(v) for k, v in self.generator.nutrient_ranges.items()}
+        ranges['zinc']['low'] = 0.1
+        self.generator.nutrient_ranges = ranges
+        self.assertEqual(self.generator.memo_stats()['recommendations']['size'], 0)
+        self.assertEqual(self.generator.generate_recommendations(PROFILE, 'rice')['fertilizer_combo_2'],
+                         ['Borax @ 10 kg/ha', 'FeSO4 @ 25 kg/ha'])
+
+    def test_ranges_cannot_be_edited_in_place(self):
+        with self.assertRaises(TypeError):
+            self.generator.nutrient_ranges['nitrogen']['low'] = 100
+        with self.assertRaises(TypeError):
+            self.generator.nutrient_ranges['nitrogen'] = {'low': 1, 'medium': 2, 'unit': ''}
+
+    def test_lru_eviction_per_kind(self):
+        with mock.patch.dict(soil_card_generator.MEMO_SIZES, {'status': 2, 'recommendations': 2}):
+            self.generator.generate_recommendations(PROFILE, 'rice')
+            for value in (100.0, 200.0, 300.0):
+                self.generator.get_nutrient_status('nitrogen', value)
+            stats = self.generator.memo_stats()
+            # Status lookups don't evict profiles
+            self.assertEqual((stats['status']['size'], stats['recommendations']['size']), (2, 1))
+            # 100.0 was least recently used and is gone
+            self.generator.get_nutrient_status('nitrogen', 100.0)
+            self.assertEqual(self.generator.memo_stats()['status']['misses'], 4)
+
+    def test_values_finer_than_lab_precision_bypass_memo(self):
+        # 279.96 would round to 280.0 and flip from LOW to MEDIUM
+        self.assertEqual(self.generator.get_nutrient_status('nitrogen', 279.96), 'LOW, DEFICIENT')
+        self.assertEqual(self.generator.get_nutrient_status('nitrogen', 280.0), 'MEDIUM, NEUTRAL')
+        stats = self.generator.memo_stats()['status']
+        self.assertEqual((stats['misses'], stats['size']), (1, 1))
+
+    def test_use_memo_false_leaves_memo_untouched(self):
+        self.generator.generate_recommendations(PROFILE, 'rice', use_memo=False)
+        self.generator.get_nutrient_status('nitrogen', 200.0, use_memo=False)
+        stats = self.generator.memo_stats()
+        self.assertEqual((stats['status']['size'], stats['recommendations']['size']), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()